@@ -1,12 +1,11 @@
 from setuptools import setup, find_packages
 import os
-import io
 from towebm._version import __version__
 
 # Read the long description from the README.
 basedir = os.path.abspath(os.path.dirname(__file__))
-with io.open(os.path.join(basedir, 'README.rst'), encoding='utf-8') as f:
-    long_description = '\n' + f.read()
+with open(os.path.join(basedir, 'README.rst'), 'rb', buffering=0) as f:
+    long_description = '\n' + f.read().decode('utf-8')
 
 setup(
     name='towebm',
@@ -14,22 +14,47 @@
 # see <http://www.gnu.org/licenses>.
 
 import os
-import re
 import sys
+import atexit
 import argparse
+import subprocess
+import threading
 from collections import namedtuple
-from collections.abc import Sequence
-import textwrap
+from functools import lru_cache
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile
 from towebm._version import __version__
 
 Segment = namedtuple('Segment', 'start, end, duration')
 
+# Values accepted by --channel-layout-fix, shared by the scripts that support it.
+CHANNEL_LAYOUT_FIXES = ('0', '4.1', '5.0', '5.1')
+
+# The audio filter that applies each channel layout fix; '0' applies no fix.
+_CHANNEL_LAYOUT_FIX_FILTERS = {
+    '5.1': 'channelmap=channel_layout=5.1',
+    '5.0': 'pan=5.1|FR=FR|FL=FL|FC=FC|BL=SL|BR=SR',
+    '4.1': 'pan=5.1|FR=FR|FL=FL|FC=FC|BL=BC|BR=BC|LFE=LFE',
+    }
+
+# Video filters for each deinterlace choice; '{0}' is replaced by the parity option, if any.
+_DEINTERLACE_FILTERS = {
+    'frame': ('bwdif=send_frame{0}',),
+    'field': ('bwdif=send_field{0}',),
+    'ivtc': ('fieldmatch', 'decimate'),
+    'ivtc+': ('fieldmatch', 'bwdif=send_frame', 'decimate'),
+    'selframe': ('fieldmatch', 'bwdif=0:-1:1'),
+    }
+
 # --------------------------------------------------------------------------------------------------
 class MultilineFormatter(argparse.HelpFormatter):
     """
     An argparse help formatter that supports using the token '|n ' to introduce newlines.
     """
     def _fill_text(self, text, width, indent):
+        # Only needed when help is displayed, so not imported with the module.
+        import textwrap
         text = self._whitespace_matcher.sub(' ', text).strip()
         paragraphs = text.split('|n ')
         multiline_text = ''
@@ -39,11 +64,51 @@ class MultilineFormatter(argparse.HelpFormatter):
             multiline_text = multiline_text + formatted_paragraph
         return multiline_text
 
+# --------------------------------------------------------------------------------------------------
+class _DelimitedValueError(Exception):
+    """
+    Raised by _parse_delimited when a delimited value list cannot be parsed or contains an
+    invalid choice.
+    """
+    pass
+
+# --------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=512)
+def _parse_delimited(values, value_type, delimiter, value_choices, value_choice_set):
+    """
+    Splits a delimited string into a tuple of values converted with 'value_type', with blank values
+    returned as None; raises _DelimitedValueError if a value cannot be converted or is not in
+    'value_choice_set' (a frozenset, or None to allow any value).  'value_choices' is the allowed
+    values in their original order, used only for the error message.  Results are cached, since the
+    same short strings tend to be parsed repeatedly.
+    """
+    # Convert and validate each value in a single pass.
+    convert = value_type is not str
+    result = []
+    for s in values.split(delimiter):
+        if s == '':
+            result.append(None)
+            continue
+        if convert:
+            try:
+                s = value_type(s)
+            except ValueError:
+                raise _DelimitedValueError("must be a list of {} values delimited by '{}'".format(
+                    value_type.__name__, delimiter))
+        if value_choice_set is not None and s not in value_choice_set:
+            raise _DelimitedValueError(
+                "invalid choice: '{}' (choose from {})".format(s, list(value_choices)))
+        result.append(s)
+    return tuple(result)
+
 # --------------------------------------------------------------------------------------------------
 class DelimitedValueAction(argparse.Action):
     """
     An argparse action that splits a list of colon-deparated values into a sequence.
     """
+    # The base class still has a __dict__, but slots give faster access to these attributes.
+    __slots__ = ('_value_type', '_delimiter', '_value_choices', '_value_choice_set')
+
     def __init__(self, option_strings, dest, value_type=str, delimiter=':', value_choices=None,
         nargs=None, type=None, choices=None, **kwargs):
         if nargs is not None:
@@ -53,44 +118,105 @@ class DelimitedValueAction(argparse.Action):
         if choices is not None:
             raise ValueError('use value_choices')
         self._value_type = value_type
-        self._delimiter = delimiter
-        self._value_choices = value_choices
+        self._delimiter = sys.intern(delimiter)
+        # Stored as a tuple and a frozenset so they can be part of the _parse_delimited cache key;
+        # the set is used for validation, and the tuple for the error message.
+        if value_choices is None:
+            self._value_choices = None
+            self._value_choice_set = None
+        else:
+            self._value_choices = tuple(value_choices)
+            self._value_choice_set = frozenset(value_choices)
         
         super().__init__(option_strings, dest, type=type, **kwargs)
 
     def __call__(self, parser, ns, values, option_string=None):
         try:
-            result = [None if s == '' else self._value_type(s)
-                for s in values.split(self._delimiter)]
-        except:
-            raise argparse.ArgumentError(self,
-                "must be a list of {} values delimited by '{}'".format(
-                self._value_type.__name__, self._delimiter))
-
-        if result is not None and self._value_choices is not None:
-            for bad_choice in [choice for choice in result
-                if choice is not None and choice not in self._value_choices]:
-                raise argparse.ArgumentError(self,
-                    "invalid choice: '{}' (choose from {})".format(
-                        bad_choice, self._value_choices
-                    ))
-        setattr(ns, self.dest, result)
+            result = _parse_delimited(values, self._value_type, self._delimiter,
+                self._value_choices, self._value_choice_set)
+        except _DelimitedValueError as e:
+            raise argparse.ArgumentError(self, str(e))
+        # Copy to a new list so changes to the argument value cannot alter the cached result.
+        setattr(ns, self.dest, list(result))
 
 # --------------------------------------------------------------------------------------------------
-def add_basic_arguments(parser):
+def positive_int(value):
     """
-    Adds basic arguments that apply to all scripts to a parser.
+    An argparse type function that converts a string to an integer greater than zero.
     """
-    parser.add_argument('--version', action='version', version='%(prog)s ' + __version__)
-    parser.add_argument('-#', '--always-number',
+    try:
+        result = int(value)
+    except ValueError:
+        result = 0
+    if result < 1:
+        raise argparse.ArgumentTypeError("invalid positive int value: '{}'".format(value))
+    return result
+
+# Argument definitions shared by the scripts, as tuples of (option strings, add_argument kwargs).
+_BASIC_ARGS = (
+    (('--version',), dict(action='version', version='%(prog)s ' + __version__)),
+    (('-#', '--always-number'), dict(
         help='always add a number to the output file name',
-        action='store_true', default=False)
-    parser.add_argument('--pretend',
+        action='store_true', default=False)),
+    (('--pretend',), dict(
         help='display command lines but do not execute',
-        action='store_true')
-    parser.add_argument('-v', '--verbose',
+        action='store_true')),
+    (('-v', '--verbose'), dict(
         help='verbose output',
-        action='count', default=0)
+        action='count', default=0)),
+    (('-j', '--jobs'), dict(
+        help='number of source files to process at the same time (default 1)',
+        action='store', type=positive_int, default=1)),
+    )
+
+_TIMECODE_ARGS = (
+    (('--start',), dict(
+        help='starting source position',
+        action='store')),
+    (('--duration',), dict(
+        help='duration to encode',
+        action='store')),
+    (('--end',), dict(
+        help='ending source position',
+        action='store')),
+    (('--segment',), dict(
+        help='segment start and end source position; may be specified multiple times to encode '
+             'multiple segments to separate files; enables --always-number when specified more '
+             'than once',
+        nargs=2, metavar=('START', 'END'), action='append', dest='segments')),
+    )
+
+_AUDIO_FILTER_ARGS = (
+    (('--fade-in',), dict(
+        help='apply an audio fade-in at the start of each output',
+        action='store', type=float, metavar='SECONDS')),
+    (('--fade-out',), dict(
+        help='apply an audio fade-out at the end of each output',
+        action='store', type=float, metavar='SECONDS')),
+    (('-f', '--filter'), dict(
+        help='custom audio filter, passed as -af argument to ffmpeg',
+        action='append', dest='audio_filter')),
+    (('--volume',), dict(
+        help='amplitude (volume) multiplier, < 1.0 to reduce volume, or > 1.0 to increase volume; '
+             'recommended to use replaygain to tag the file post-conversion, instead',
+        action='store', type=float, default=1.0)),
+    )
+
+# --------------------------------------------------------------------------------------------------
+def add_arguments(parser, arg_defs):
+    """
+    Adds each argument in a tuple of (option strings, add_argument kwargs) to a parser or argument
+    group.
+    """
+    for flags, kwargs in arg_defs:
+        parser.add_argument(*flags, **kwargs)
+
+# --------------------------------------------------------------------------------------------------
+def add_basic_arguments(parser):
+    """
+    Adds basic arguments that apply to all scripts to a parser.
+    """
+    add_arguments(parser, _BASIC_ARGS)
 
 # --------------------------------------------------------------------------------------------------
 def add_timecode_arguments(parser):
@@ -103,20 +229,7 @@ def add_timecode_arguments(parser):
         'last not not be combined with the first three.  The same arguments will be applied to '
         'all source files.  All argument values are in ffmpeg duration format; see ffmpeg '
         'documentation for more details.')
-    sgroup.add_argument('--start',
-        help='starting source position',
-        action='store')
-    sgroup.add_argument('--duration',
-        help='duration to encode',
-        action='store')
-    sgroup.add_argument('--end',
-        help='ending source position',
-        action='store')
-    sgroup.add_argument('--segment',
-        help='segment start and end source position; may be specified multiple times to encode '
-             'multiple segments to separate files; enables --always-number when specified more '
-             'than once',
-        nargs=2, metavar=('START', 'END'), action='append', dest='segments')
+    add_arguments(sgroup, _TIMECODE_ARGS)
     return sgroup
 
 # --------------------------------------------------------------------------------------------------
@@ -125,19 +238,7 @@ def add_audio_filter_arguments(parser):
     Adds filter arguments that apply to audio-only encodes to a parser.
     """
     fgroup = parser.add_argument_group('filter arguments')
-    fgroup.add_argument('--fade-in',
-        help='apply an audio fade-in at the start of each output',
-        action='store', type=float, metavar='SECONDS')
-    fgroup.add_argument('--fade-out',
-        help='apply an audio fade-out at the end of each output',
-        action='store', type=float, metavar='SECONDS')
-    fgroup.add_argument('-f', '--filter',
-        help='custom audio filter, passed as -af argument to ffmpeg',
-        action='append', dest='audio_filter')
-    fgroup.add_argument('--volume', 
-        help='amplitude (volume) multiplier, < 1.0 to reduce volume, or > 1.0 to increase volume; '
-             'recommended to use replaygain to tag the file post-conversion, instead',
-        action='store', type=float, default=1.0)
+    add_arguments(fgroup, _AUDIO_FILTER_ARGS)
 
 # --------------------------------------------------------------------------------------------------
 def add_passthrough_arguments(parser):
@@ -156,24 +257,93 @@ def check_timecode_arguments(parser, args):
     Raises a parser error if args contains an invalid combination of --start, --end, --duration,
     and --segment.
     """
+    get = vars(args).get
+    has_start = get('start') is not None
+    has_duration = get('duration') is not None
+    has_end = get('end') is not None
+    has_segments = get('segments') is not None
+
     # Check for invalid combinations.
-    if args.duration is not None and args.end is not None:
+    if has_duration and has_end:
         parser.error('--duration and --end may not be used together')
-    if args.start is not None or args.duration is not None or args.end is not None:
-        if args.segments is not None:
-            parser.error('--segments may not be used with other segment selectors')
-    if args.fade_out is not None:
-        if args.duration is None and args.end is None and args.segments is None:
-            parser.error('--fade-out requires --duration, --end, or --segment')
+    if has_segments and (has_start or has_duration or has_end):
+        parser.error('--segments may not be used with other segment selectors')
+    if get('fade_out') is not None and not (has_duration or has_end or has_segments):
+        parser.error('--fade-out requires --duration, --end, or --segment')
 
 # --------------------------------------------------------------------------------------------------
 def check_source_files_exist(parser, args):
     """
-    Raises a parser error if args contains any source files that do not exist.
+    Raises a parser error listing all source files in args that do not exist.
     """
+    missing = []
     for source_file in args.source_files:
-        if not os.path.exists(source_file):
-            parser.error('invalid source file: ' + source_file)
+        try:
+            os.stat(source_file)
+        except (OSError, ValueError):
+            missing.append(source_file)
+    if len(missing) == 1:
+        parser.error('invalid source file: ' + missing[0])
+    elif len(missing) > 1:
+        parser.error('invalid source files: ' + ', '.join(missing))
+
+# --------------------------------------------------------------------------------------------------
+def process_files(args, process_file):
+    """
+    Calls process_file(args, source_file) for each source file in args, running up to 'args.jobs'
+    at the same time.  Each source file is treated as its own job, so an execution error is reported
+    and processing continues with the remaining source files.  Returns the highest return code of
+    any failed command, or 0 if all succeeded.
+    """
+    # The work is done by ffmpeg subprocesses, so threads are enough to run them in parallel.
+    ret = 0
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(process_file, args, source_file)
+                   for source_file in args.source_files]
+        try:
+            for future in futures:
+                try:
+                    future.result()
+                except subprocess.CalledProcessError as e:
+                    if ret == 0 or e.returncode > ret:
+                        ret = e.returncode
+                    print('Execution error, proceeding to next source file.')
+        except BaseException:
+            # E.g., KeyboardInterrupt; don't start any source files that are still waiting.
+            for future in futures:
+                future.cancel()
+            raise
+    return ret
+
+# --------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_title(file_name):
+    """
+    Returns the title for a source file, which is the file name without directory or extension, and
+    is used for output file names and metadata.  Results are cached, since the title is needed for
+    every command of every segment.
+    """
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+# Output file names chosen by get_safe_filename during this run, and a cache of directory listings
+# used to choose them; guarded by a lock, since source files may be processed concurrently.
+_reserved_filenames = set()
+_directory_names = {}
+_safe_filename_lock = threading.Lock()
+
+# --------------------------------------------------------------------------------------------------
+def _get_directory_names(directory):
+    """
+    Returns the set of file names in a directory, listing the directory only on the first call.
+    """
+    names = _directory_names.get(directory)
+    if names is None:
+        try:
+            names = set(os.listdir(directory or os.curdir))
+        except OSError:
+            names = set()
+        _directory_names[directory] = names
+    return names
 
 # --------------------------------------------------------------------------------------------------
 def get_safe_filename(filename, always_number):
@@ -181,45 +351,128 @@ def get_safe_filename(filename, always_number):
     Returns the source file name if no file exists with the given name and 'always_number' is false;
     returns the source file name with an understore and two-digit sequence number appended to make
     the file name unique if the source file name is not unique or 'always_number' is true; if no
-    such file name is unique, returns the source file name.
+    such file name is unique, returns the source file name.  A name returned once is not returned
+    again during the same run, even if the file has not been created yet.
     """
-    if not always_number and not os.path.exists(filename):
-        return filename
-    else:
-        (base, ext) = os.path.splitext(filename)
-        for i in range(100):
-            s = '{0}_{1:02}{2}'.format(base, i, ext)
-            if not os.path.exists(s):
-                return s
-        return filename
+    with _safe_filename_lock:
+        if (not always_number and filename not in _reserved_filenames and
+            not os.path.exists(filename)):
+            result = filename
+        else:
+            # Use a listing of the directory, read once per run, to skip numbers that are already
+            # taken, rather than checking each candidate in turn.  The chosen name is still checked,
+            # in case the listing is stale or the file system is not case-sensitive.
+            names = _get_directory_names(os.path.dirname(filename))
+            (base, ext) = os.path.splitext(filename)
+            result = filename
+            for i in range(100):
+                s = '{0}_{1:02}{2}'.format(base, i, ext)
+                if (s not in _reserved_filenames and os.path.basename(s) not in names and
+                    not os.path.exists(s)):
+                    result = s
+                    break
+        _reserved_filenames.add(result)
+        return result
+
+# Divisors to convert a seconds, milliseconds, or microseconds duration value to seconds.  'ms' and
+# 'us' must be checked before 's', since they also end with 's'.
+_DURATION_UNITS = (('ms', 1000.0), ('us', 1000000.0), ('s', 1.0))
+
+# --------------------------------------------------------------------------------------------------
+def _is_decimal_seconds(value):
+    """
+    Returns true if the value is a string of one or more digits with an optional decimal point and
+    fractional digits.
+    """
+    whole, point, fraction = value.partition('.')
+    return whole.isdecimal() and (fraction == '' or fraction.isdecimal())
 
 # --------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=1024)
 def duration_to_seconds(duration):
     """
     Converts an ffmpeg duration string into a decimal representing the number of seconds
-    represented by the duration string; None if the string is not parsable.
-    """
-    pattern = r'^((((?P<hms_grp1>\d*):)?((?P<hms_grp2>\d*):)?((?P<hms_secs>\d+([.]\d*)?)))|' \
-              '((?P<smu_value>\d+([.]\d*)?)(?P<smu_units>s|ms|us)))$'
-    match = re.match(pattern, duration)
-    if match:
-        groups = match.groupdict()
-        if groups['hms_secs'] is not None:
-            value = float(groups['hms_secs'])
-            if groups['hms_grp2'] is not None:
-                value += int(groups['hms_grp1']) * 60 * 60 + int(groups['hms_grp2']) * 60
-            elif groups['hms_grp1'] is not None:
-                value += int(groups['hms_grp1']) * 60
-        else:
-            value = float(groups['smu_value'])
-            units = groups['smu_units']
-            if units == 'ms':
-                value /= 1000.0
-            elif units == 'us':
-                value /= 1000000.0
-        return value
-    else:
+    represented by the duration string; None if the string is not parsable.  Results are cached,
+    since the same segment times are converted for every source file.
+    """
+    # Plain whole seconds are the most common form, so check for them first.
+    if duration.isdecimal():
+        return float(duration)
+
+    # Seconds with units: S+[.m...](s|ms|us).
+    for units, divisor in _DURATION_UNITS:
+        if duration.endswith(units):
+            value = duration[:-len(units)]
+            return float(value) / divisor if _is_decimal_seconds(value) else None
+
+    # Sexagesimal: [[HH:]MM:]SS[.m...].
+    parts = duration.split(':')
+    if len(parts) > 3 or not _is_decimal_seconds(parts[-1]):
+        return None
+    if not all(part.isdecimal() for part in parts[:-1]):
         return None
+    value = float(parts[-1])
+    if len(parts) == 3:
+        value += int(parts[0]) * 60 * 60 + int(parts[1]) * 60
+    elif len(parts) == 2:
+        value += int(parts[0]) * 60
+    return value
+
+# --------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=256)
+def get_segment_seconds(segment):
+    """
+    Returns the duration of a segment in seconds, from either its duration or its start and end
+    positions.  Results are cached, since the same segment is used for both the video and audio
+    fade-out filters, and for both passes.
+    """
+    (start, end, duration) = segment
+    if duration is not None:
+        return duration_to_seconds(duration)
+    else:
+        start_seconds = 0.0 if start is None else duration_to_seconds(start)
+        return duration_to_seconds(end) - start_seconds
+
+# Filter graphs longer than this many bytes are passed to ffmpeg in a file, since Linux limits the
+# length of a single command line argument to 128 KiB.
+_MAX_FILTER_ARG_LENGTH = 100000
+
+# Filter graph files written by get_filter_complex_args, removed at exit.
+_filter_script_files = []
+
+# --------------------------------------------------------------------------------------------------
+def _remove_filter_script_files():
+    """
+    Removes the filter graph files written by get_filter_complex_args.
+    """
+    for file_name in _filter_script_files:
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+
+atexit.register(_remove_filter_script_files)
+
+# --------------------------------------------------------------------------------------------------
+def get_filter_complex_args(filter_graph, pretend=False):
+    """
+    Returns a list of ffmpeg arguments to apply a complex filter graph; the graph is passed as a
+    -filter_complex argument, or if it is too long for a command line argument, it is written to a
+    temporary file that is passed as a -filter_complex_script argument.  When pretend is true, no
+    file is written, and the graph is always passed as a -filter_complex argument.
+    """
+    if pretend:
+        return ['-filter_complex', filter_graph]
+
+    encoded_graph = filter_graph.encode('utf-8')
+    if len(encoded_graph) <= _MAX_FILTER_ARG_LENGTH:
+        return ['-filter_complex', filter_graph]
+    else:
+        # ffmpeg reads the script as UTF-8, so write the bytes already encoded.
+        with NamedTemporaryFile(mode='wb', suffix='.filter', delete=False) as script:
+            _filter_script_files.append(script.name)
+            script.write(encoded_graph)
+        return ['-filter_complex_script', script.name]
 
 # --------------------------------------------------------------------------------------------------
 def get_video_filter_args(args, segment):
@@ -230,29 +483,20 @@ def get_video_filter_args(args, segment):
     filters = []
     
     # Deinterlace first.
-    parity = ''
-    if args.parity is not None:
-        parity = ':' + args.parity
-    if args.deinterlace == 'frame':
-        filters += ['bwdif=send_frame' + parity]
-    elif args.deinterlace == 'field':
-        filters += ['bwdif=send_field' + parity]
-    elif args.deinterlace == 'ivtc':
-        filters += ['fieldmatch', 'decimate']
-    elif args.deinterlace == 'ivtc+':
-        filters += ['fieldmatch', 'bwdif=send_frame', 'decimate']
-    elif args.deinterlace == 'selframe':
-        filters += ['fieldmatch', 'bwdif=0:-1:1']
+    deinterlace_filters = _DEINTERLACE_FILTERS.get(args.deinterlace)
+    if deinterlace_filters is not None:
+        parity = '' if args.parity is None else ':' + args.parity
+        filters.extend(f.format(parity) for f in deinterlace_filters)
     
     # Want to apply standard filters is a certain order, so do not loop.
     if args.standard_filter is not None:
         if 'gray' in args.standard_filter:
-            filters += ['format=gray']
+            filters.append('format=gray')
         if 'crop43' in args.standard_filter:
-            filters += ['crop=w=(in_h*4/3)']
+            filters.append('crop=w=(in_h*4/3)')
 
     if args.gamma != 1.0:
-        filters += ['eq=gamma={g}'.format(g=args.gamma)]
+        filters.append('eq=gamma={g}'.format(g=args.gamma))
 
     if args.crop_width is not None or args.crop_height is not None:
         if args.crop_width is not None and args.crop_height is not None:
@@ -261,33 +505,28 @@ def get_video_filter_args(args, segment):
             crop = 'crop=x={x[0]}:w=in_w-{x[0]}-{x[1]}'
         else:
             crop = 'crop=y={y[0]}:h=in_h-{y[0]}-{y[1]}'
-        filters += [crop.format(x=args.crop_width, y=args.crop_height)]
+        filters.append(crop.format(x=args.crop_width, y=args.crop_height))
     
     if args.standard_filter is not None:
         if 'scale23' in args.standard_filter:
-            filters += ['scale=h=in_h*2/3:w=-1']
+            filters.append('scale=h=in_h*2/3:w=-1')
     
     # The fade filters take a start time relative to the start of the output, rather than the start
     # of the source.  So, fade in will start at 0 secs.  Fade out needs to get the output duration
     # and subtract the fade out duration.
     if args.fade_in is not None:
-        filters += ['fade=t=in:st=0:d={0}'.format(args.fade_in)]
+        filters.append('fade=t=in:st=0:d={0}'.format(args.fade_in))
     if args.fade_out is not None:
-        if segment.duration is not None:
-            duration = duration_to_seconds(segment.duration)
-        else:
-            start = 0.0 if segment.start is None else duration_to_seconds(segment.start)
-            duration = duration_to_seconds(segment.end) - start
-        filters += ['fade=t=out:st={0}:d={1}'.format(duration - args.fade_out, args.fade_out)]
+        duration = get_segment_seconds(segment)
+        filters.append('fade=t=out:st={0}:d={1}'.format(duration - args.fade_out, args.fade_out))
 
     if args.filter is not None:
-        for filter in args.filter:
-            filters += [filter]
+        filters.extend(args.filter)
 
     if len(filters) == 0:
         filters = ['copy']
 
-    return ['-filter_complex', '[0:v]' + ','.join(filters)]
+    return get_filter_complex_args('[0:v]' + ','.join(filters), args.pretend)
 
 # --------------------------------------------------------------------------------------------------
 def get_audio_filters(args, segment):
@@ -298,63 +537,54 @@ def get_audio_filters(args, segment):
     
     # Want to apply standard filters is a certain order, so do not loop.
     if args.volume != 1.0:
-        filters += ['volume={v}'.format(v=args.volume)]
+        filters.append('volume={v}'.format(v=args.volume))
 
     # The fade filters take a start time relative to the start of the output, rather than the start
     # of the source.  So, fade in will start at 0 secs.  Fade out needs to get the output duration
     # and subtract the fade out duration.
     if args.fade_in is not None:
-        filters += ['afade=t=in:st=0:d={0}'.format(args.fade_in)]
+        filters.append('afade=t=in:st=0:d={0}'.format(args.fade_in))
     if args.fade_out is not None:
-        if segment.duration is not None:
-            duration = duration_to_seconds(segment.duration)
-        else:
-            start = 0.0 if segment.start is None else duration_to_seconds(segment.start)
-            duration = duration_to_seconds(segment.end) - start
-        filters += ['afade=t=out:st={0}:d={1}'.format(duration - args.fade_out, args.fade_out)]
+        duration = get_segment_seconds(segment)
+        filters.append('afade=t=out:st={0}:d={1}'.format(duration - args.fade_out, args.fade_out))
         
     if args.audio_filter is not None:
-        for filter in args.audio_filter:
-            filters += [filter]
+        filters.extend(args.audio_filter)
 
     return filters
 
+# --------------------------------------------------------------------------------------------------
+def get_audio_track_filters(joined_filters, layout_fix):
+    """
+    Returns the filter chain for one audio track, given the joined filters that apply to every track
+    and the channel layout fix value for the track, which may be None.
+    """
+    fix_filter = _CHANNEL_LAYOUT_FIX_FILTERS.get(layout_fix)
+    if fix_filter is None:
+        return joined_filters or 'acopy'
+    elif joined_filters:
+        return fix_filter + ',' + joined_filters
+    else:
+        return fix_filter
+
 # --------------------------------------------------------------------------------------------------
 def get_audio_filter_args(args, segment):
     """
     Returns a list of ffmpeg arguments that apply all of the selected audio filters requested in the
     script arguments, or an empty list if none apply.
     """
-    filters = get_audio_filters(args, segment)
-    per_track_filters = []
-
-    # We need to specify the input index for each that audio stream that will be output.  So, we
-    # iterate the list with index, rather than use list comprehension.
-    for i, quality in enumerate(args.audio_quality):
-        if quality is not None and quality > 0:
-            # channel_layout_fix is going to use the same index, but it may have fewer values
-            # specified than audio_quality.
-            map_fix = (
-                hasattr(args, 'channel_layout_fix') and
-                i < len(args.channel_layout_fix) and
-                args.channel_layout_fix[i] is not None and
-                args.channel_layout_fix[i] != '0')
-            if map_fix and (args.channel_layout_fix[i] == '5.1'):
-                flts = ['channelmap=channel_layout=5.1'] + filters
-            elif map_fix and args.channel_layout_fix[i] == '5.0':
-                flts = ['pan=5.1|FR=FR|FL=FL|FC=FC|BL=SL|BR=SR'] + filters
-            elif map_fix and args.channel_layout_fix[i] == '4.1':
-                flts = ['pan=5.1|FR=FR|FL=FL|FC=FC|BL=BC|BR=BC|LFE=LFE'] + filters
-            elif len(filters) == 0:
-                flts = ['acopy']
-            else:
-                flts = filters
-            per_track_filters.append('[0:a:{0}]'.format(i) + ','.join(flts))
-
-    if len(per_track_filters) == 0:
+    # Skip building the filters if no audio track will be output.
+    if len(args.audio_tracks) == 0:
         return []
-    else:
-        return ['-filter_complex', ';'.join(per_track_filters)]
+
+    # The same filters apply to every track, so join them once.
+    joined_filters = ','.join(get_audio_filters(args, segment))
+
+    # We need to specify the input index for each that audio stream that will be output.
+    per_track_filters = [
+        '[0:a:{0}]{1}'.format(i, get_audio_track_filters(joined_filters, layout_fix))
+        for i, quality, layout_fix in args.audio_tracks]
+    return get_filter_complex_args(';'.join(per_track_filters), args.pretend)
 
 # --------------------------------------------------------------------------------------------------
 def get_segment_arguments(segment):
@@ -362,13 +592,14 @@ def get_segment_arguments(segment):
     Returns a list of ffmepg arguments to select a portion of the input as requested by the user in
     the script arguments, or an empty list if none apply.
     """
+    (start, end, duration) = segment
     result = []
-    if segment.start is not None:
-        result += ['-accurate_seek', '-ss', segment.start]
-    if segment.end is not None:
-        result += ['-to', segment.end]
-    if segment.duration is not None:
-        result += ['-t', segment.duration]
+    if start is not None:
+        result.extend(('-accurate_seek', '-ss', start))
+    if end is not None:
+        result.extend(('-to', end))
+    if duration is not None:
+        result.extend(('-t', duration))
     return result
 
 # --------------------------------------------------------------------------------------------------
@@ -376,7 +607,6 @@ def get_audio_quality_arg(quality, stream_index = None):
     """
     Returns a list two ffmpeg arguments for a given audio quality and optional output stream index.
     """
-    result = []
     if isinstance(quality, float):
         if stream_index is None:
             arg = '-q:a'
@@ -396,11 +626,10 @@ def get_audio_quality_args(args):
     Returns a list of one or more sets of ffmpeg audio quality arguments based on the script audio
     quality arguments.
     """
-    # We only output a quality for non-zero values, and since the stream index is the output index,
-    # we can use the index of a filtered list.
+    # Only non-zero qualities are in audio_tracks, and the stream index is the output index.
     result = []
-    for i, quality in enumerate([q for q in args.audio_quality if q is not None and q > 0]):
-        result += get_audio_quality_arg(quality, i)
+    for output_index, (input_index, quality, layout_fix) in enumerate(args.audio_tracks):
+        result += get_audio_quality_arg(quality, output_index)
     return result
 
 # --------------------------------------------------------------------------------------------------
@@ -421,17 +650,11 @@ def get_audio_metadata_map_args(args):
     Returns a list of ffmpeg arguments to copy audio metadata from the input streams to the matching
     output streams.
     """
-    if isinstance(args.audio_quality, Sequence):
-        # We need both the input and output index to create the map.
-        result = []
-        output_index = 0
-        for input_index, quality in enumerate(args.audio_quality):
-            if quality is not None and quality > 0:
-                result += get_audio_metadata_map_arg(output_index, input_index)
-                output_index += 1
-        return result
-    elif args.audio_quality > 0:
-        return get_audio_metadata_map_arg()
+    # We need both the input and output index to create the map.
+    result = []
+    for output_index, (input_index, quality, layout_fix) in enumerate(args.audio_tracks):
+        result += get_audio_metadata_map_arg(output_index, input_index)
+    return result
 
 # --------------------------------------------------------------------------------------------------
 def parse_args(parser):
@@ -440,11 +663,39 @@ def parse_args(parser):
     while anything before is parsed using the given argparse parser.  The passthrough arguments are
     added to the result args as 'passthrough_args'.
     """
-    argv = sys.argv[1:]
-    idx = argv.index('--') if '--' in argv else -1
-    pargs = argv[idx + 1:] if idx >= 0 else []
-    argv = argv[:idx] if idx >= 0 else argv
-    args = parser.parse_args(argv)
-    args.passthrough_args = pargs
+    # Index into sys.argv directly, skipping the program name, so that only the two slices that
+    # are actually needed are copied.
+    argv = sys.argv
+    try:
+        idx = argv.index('--', 1)
+    except ValueError:
+        args = parser.parse_args(argv[1:])
+        args.passthrough_args = []
+    else:
+        args = parser.parse_args(argv[1:idx])
+        args.passthrough_args = argv[idx + 1:]
+    return normalize_args(args)
+
+# --------------------------------------------------------------------------------------------------
+def normalize_args(args):
+    """
+    Gives the optional arguments used by the shared routines a consistent form, so that those
+    routines do not need to check for them each time they are called: 'channel_layout_fix' is
+    always a list, and 'audio_quality', if present, is always a list.  When 'audio_quality' is
+    present, 'audio_tracks' is also set to a list of (input_index, quality, layout_fix) tuples for
+    the audio streams that will be output, in output order.  Returns args.
+    """
+    if getattr(args, 'channel_layout_fix', None) is None:
+        args.channel_layout_fix = []
+    if 'audio_quality' in args:
+        if not isinstance(args.audio_quality, list):
+            args.audio_quality = [args.audio_quality]
+        # channel_layout_fix may have fewer values specified than audio_quality (or none, for
+        # scripts without the argument); zip_longest pads it with None.
+        args.audio_tracks = [
+            (i, quality, layout_fix)
+            for i, (quality, layout_fix)
+            in enumerate(zip_longest(args.audio_quality, args.channel_layout_fix))
+            if quality is not None and quality > 0]
     return args
     
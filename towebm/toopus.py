@@ -16,7 +16,6 @@
 # see <http://www.gnu.org/licenses>.
 
 import sys
-import os
 import subprocess
 from argparse import ArgumentParser
 from towebm.common import *
@@ -41,7 +40,7 @@ def main():
              'compatible 5.1(rear) layout; may be a colon-delimited list to apply the fix to '
              'multiple audio tracks from the source; use 0 or blank to apply no fix',
         action=DelimitedValueAction, metavar="FIX_STRING",
-        value_choices=['0', '4.1', '5.0', '5.1'], default=['0'])
+        value_choices=CHANNEL_LAYOUT_FIXES, default=['0'])
 
     # Timecode/segment arguments.
     add_timecode_arguments(parser)
@@ -60,7 +59,7 @@ def main():
     args = parse_args(parser)
     if args.segments is not None and len(args.segments) > 1:
         args.always_number = True
-    qcnt = len([q for q in args.audio_quality if q is not None and q > 0])
+    qcnt = len(args.audio_tracks)
     if qcnt < 1:
         parser.error('at least one positive audio bitrate must be specified')
     elif qcnt > 1:
@@ -73,35 +72,27 @@ def main():
     check_source_files_exist(parser, args)
 
     # We'll treat each input file as it's own job, and continue to the next if there is a problem.
-    ret = 0
-    for source_file in args.source_files:
-        try:
-            process_file(args, source_file)
-        except subprocess.CalledProcessError as e:
-            if ret == 0 or e.returncode > ret:
-                ret = e.returncode
-            print('Execution error, proceeding to next source file.')
-    exit(ret)
+    exit(process_files(args, process_file))
 
 # --------------------------------------------------------------------------------------------------
 def get_ffmpeg_command(args, segment, file_name):
     """
     Returns the arguments to run ffmpeg for a single output file.
     """
-    title = os.path.splitext(os.path.basename(file_name))[0]
+    title = get_title(file_name)
     
     result = ['ffmpeg', '-nostdin', '-hide_banner']
     result += get_segment_arguments(segment)
-    result += [
+    result.extend((
         '-i', file_name,
         '-vn',
         '-c:a', 'libopus'
-        ]
+        ))
     result += get_audio_filter_args(args, segment)
     result += get_audio_quality_args(args)
     result += get_audio_metadata_map_args(args)
     result += args.passthrough_args
-    result += [get_safe_filename(title + '.opus', args.always_number)]
+    result.append(get_safe_filename(title + '.opus', args.always_number))
 
     return result
 
@@ -16,7 +16,6 @@
 # see <http://www.gnu.org/licenses>.
 
 import sys
-import os
 import subprocess
 from argparse import ArgumentParser
 from towebm.common import *
@@ -57,42 +56,34 @@ def main():
 
     if args.verbose >= 1:
         print (args)
-    if len([q for q in args.audio_quality if q is not None and q > 0]) < 1:
+    if len(args.audio_tracks) == 0:
         parser.error('at least one positive audio quality must be specified')
 
     check_timecode_arguments(parser, args)
     check_source_files_exist(parser, args)
 
     # We'll treat each input file as it's own job, and continue to the next if there is a problem.
-    ret = 0
-    for source_file in args.source_files:
-        try:
-            process_file(args, source_file)
-        except subprocess.CalledProcessError as e:
-            if ret == 0 or e.returncode > ret:
-                ret = e.returncode
-            print('Execution error, proceeding to next source file.')
-    exit(ret)
+    exit(process_files(args, process_file))
 
 # --------------------------------------------------------------------------------------------------
 def get_ffmpeg_command(args, segment, file_name):
     """
     Returns the arguments to run ffmpeg for a single output file.
     """
-    title = os.path.splitext(os.path.basename(file_name))[0]
+    title = get_title(file_name)
     
     result = ['ffmpeg', '-nostdin', '-hide_banner']
     result += get_segment_arguments(segment)
-    result += [
+    result.extend((
         '-i', file_name,
         '-vn',
         '-c:a', 'libvorbis'
-        ]
+        ))
     result += get_audio_filter_args(args, segment)
     result += get_audio_quality_args(args)
     result += get_audio_metadata_map_args(args)
     result += args.passthrough_args
-    result += [get_safe_filename(title + '.ogg', args.always_number)]
+    result.append(get_safe_filename(title + '.ogg', args.always_number))
 
     return result
 
@@ -18,9 +18,9 @@
 import sys
 import os
 import subprocess
+import multiprocessing
 from datetime import datetime
 from argparse import ArgumentParser
-from collections.abc import Sequence
 from towebm.common import *
 
 # --------------------------------------------------------------------------------------------------
@@ -47,7 +47,7 @@ def main():
              'multiple audio tracks from the source; values are 4.1, 5.0, 5.1, 0 or blank to apply '
              'no fix',
         action=DelimitedValueAction, metavar="FIX_STRING",
-        value_choices=['0', '4.1', '5.0', '5.1'], default=['0'])
+        value_choices=CHANNEL_LAYOUT_FIXES, default=['0'])
     # Note: 'pass' is a keyword, so used name 'only_pass' internally.
     parser.add_argument('--pass',
         help='run only a given pass',
@@ -129,28 +129,62 @@ def main():
 
     check_timecode_arguments(parser, args)
     check_source_files_exist(parser, args)
+    check_unique_titles(parser, args)
 
     # We'll treat each input file as it's own job, and continue to the next if there is a problem.
-    ret = 0
+    exit(process_files(args, process_file))
+
+# --------------------------------------------------------------------------------------------------
+def check_unique_titles(parser, args):
+    """
+    Raises a parser error listing the titles shared by more than one source file when source files
+    are processed at the same time, since the pass log is named after the title.
+    """
+    if args.jobs == 1:
+        return
+    seen = set()
+    duplicates = []
     for source_file in args.source_files:
-        try:
-            process_file(args, source_file)
-        except subprocess.CalledProcessError as e:
-            if ret == 0 or e.returncode > ret:
-                ret = e.returncode
-            print('Execution error, proceeding to next source file.')
-    exit(ret)
+        title = get_title(source_file)
+        if title in seen:
+            if title not in duplicates:
+                duplicates.append(title)
+        else:
+            seen.add(title)
+    if len(duplicates) == 1:
+        parser.error('duplicate source file title with --jobs: ' + duplicates[0])
+    elif len(duplicates) > 1:
+        parser.error('duplicate source file titles with --jobs: ' + ', '.join(duplicates))
+
+# --------------------------------------------------------------------------------------------------
+def get_thread_count(args):
+    """
+    Returns the ffmpeg -threads value as a string.  This is 8 when source files are processed one at
+    a time; otherwise, the CPUs are divided among the jobs, so that concurrent encodes do not
+    oversubscribe the CPU.
+    """
+    if args.jobs == 1:
+        return '8'
+    # os.cpu_count is not available before Python 3.4.
+    try:
+        cpu_count = multiprocessing.cpu_count()
+    except NotImplementedError:
+        cpu_count = 1
+    return str(min(8, max(1, cpu_count // args.jobs)))
 
 # --------------------------------------------------------------------------------------------------
-def get_pass1_command(args, segment, file_name):
+def get_pass1_command(args, segment, file_name, video_filter_args=None):
     """
-    Returns the arguments to run ffmpeg for pass one of a single output file.
+    Returns the arguments to run ffmpeg for pass one of a single output file.  video_filter_args,
+    if given, is the result of get_video_filter_args for the segment, so that it need not be
+    built again for each pass.
     """
-    title = os.path.splitext(os.path.basename(file_name))[0]
+    if video_filter_args is None:
+        video_filter_args = get_video_filter_args(args, segment)
 
     result = ['ffmpeg', '-nostdin', '-hide_banner']
     result += get_segment_arguments(segment)
-    result += [
+    result.extend((
         '-i', file_name,
         '-c:v', 'libvpx-vp9',
         '-crf', str(args.quality),
@@ -160,32 +194,37 @@ def get_pass1_command(args, segment, file_name):
         '-auto-alt-ref', '1',
         '-lag-in-frames', '25',
         '-pix_fmt', 'yuv420p'
-        ]
-    result += get_video_filter_args(args, segment)
-    result += [
+        ))
+    result += video_filter_args
+    result.extend((
         '-an',
         '-f', 'webm',
-        '-threads', '8',
+        '-threads', get_thread_count(args),
         '-pass', '1',
-        '-passlogfile', title,
+        '-passlogfile', get_title(file_name),
         '-cpu-used', '4',
         '-y'
-        ]
+        ))
     result += args.passthrough_args
-    result += ['/dev/null']
+    result.append('/dev/null')
 
     return result
 
 # --------------------------------------------------------------------------------------------------
-def get_pass2_command(args, segment, file_name):
+def get_pass2_command(args, segment, file_name, video_filter_args=None):
     """
-    Returns the arguments to run ffmpeg for pass two of a single output file.
+    Returns the arguments to run ffmpeg for pass two of a single output file.  video_filter_args,
+    if given, is the result of get_video_filter_args for the segment, so that it need not be
+    built again for each pass.
     """
-    title = os.path.splitext(os.path.basename(file_name))[0]
+    if video_filter_args is None:
+        video_filter_args = get_video_filter_args(args, segment)
+
+    title = get_title(file_name)
     
     result = ['ffmpeg', '-nostdin', '-hide_banner']
     result += get_segment_arguments(segment)
-    result += [
+    result.extend((
         '-i', file_name,
         '-c:v', 'libvpx-vp9',
         '-crf', str(args.quality),
@@ -195,25 +234,25 @@ def get_pass2_command(args, segment, file_name):
         '-auto-alt-ref', '1',
         '-lag-in-frames', '25',
         '-pix_fmt', 'yuv420p'
-        ]
-    result += get_video_filter_args(args, segment)
-    if len([q for q in args.audio_quality if q is not None and q > 0]) > 0:
-        result += ['-c:a', 'libopus']
+        ))
+    result += video_filter_args
+    if len(args.audio_tracks) > 0:
+        result.extend(('-c:a', 'libopus'))
     else:
-        result += ['-an']
+        result.append('-an')
     result += get_audio_filter_args(args, segment)
     result += get_audio_quality_args(args)
-    result += [
+    result.extend((
         '-f', 'webm',
-        '-threads', '8',
+        '-threads', get_thread_count(args),
         '-pass', '2',
         '-passlogfile', title,
         '-cpu-used', '2',
         '-metadata', 'title={0}'.format(title)
-        ]
+        ))
     result += get_audio_metadata_map_args(args)
     result += args.passthrough_args
-    result += [get_safe_filename(title + '.' + args.container, args.always_number)]
+    result.append(get_safe_filename(title + '.' + args.container, args.always_number))
 
     return result
 
@@ -223,7 +262,7 @@ def get_log_command(args, file_name):
     Returns the arguments to either delete or rename the pass one log file, as requested by the
     user in the script arguemnts.
     """
-    title = os.path.splitext(os.path.basename(file_name))[0]
+    title = get_title(file_name)
     if args.delete_log:
         return ['rm', '{0}-0.log'.format(title)]
     else:
@@ -231,19 +270,37 @@ def get_log_command(args, file_name):
                 '{0}-0.log'.format(title),
                 '{0}_{1:%Y%m%d-%H%M%S}.log'.format(title, datetime.now())]
 
+# --------------------------------------------------------------------------------------------------
+def run_log_command(logcmd):
+    """
+    Performs the delete or rename returned by get_log_command directly, rather than starting a
+    separate process for it.  A failure is reported the same way a failed command would be.
+    """
+    try:
+        if logcmd[0] == 'rm':
+            os.unlink(logcmd[1])
+        else:
+            os.replace(logcmd[1], logcmd[2])
+    except OSError as e:
+        print('{0}: {1}'.format(logcmd[0], e), file=sys.stderr)
+        raise subprocess.CalledProcessError(1, logcmd)
+
 # --------------------------------------------------------------------------------------------------
 def process_segment(args, segment, file_name):
     """
     Executes the requested action for a single output file.
     """
+    # Both passes use the same video filters, and a long filter graph is written to a file, so
+    # build them only once.
+    video_filter_args = get_video_filter_args(args, segment)
     if args.only_pass is None or args.only_pass == '1':
-        pass1cmd = get_pass1_command(args, segment, file_name)
+        pass1cmd = get_pass1_command(args, segment, file_name, video_filter_args)
         if args.pretend or args.verbose >= 1:
             print(pass1cmd)
         if not args.pretend:
             subprocess.check_call(pass1cmd)
     if args.only_pass is None or args.only_pass == '2':
-        pass2cmd = get_pass2_command(args, segment, file_name)
+        pass2cmd = get_pass2_command(args, segment, file_name, video_filter_args)
         logcmd = get_log_command(args, file_name)
         if args.pretend or args.verbose >= 1:
             print(pass2cmd)
@@ -252,7 +309,7 @@ def process_segment(args, segment, file_name):
         if args.pretend or args.verbose >= 1:
             print(logcmd)
         if not args.pretend:
-            subprocess.check_call(logcmd)
+            run_log_command(logcmd)
     
 # --------------------------------------------------------------------------------------------------
 def process_file(args, file_name):